@@ -1,11 +1,36 @@
 import re
 import sys
+from collections import namedtuple
+from enum import IntEnum
 
 # --- 1. 词法分析 (Lexer) ---
 
+# Token 用 namedtuple 表示, 按属性访问 (token.type, token.value, ...)
+# kw_id 是关键字编号 (Kw), 非关键字为 0
+Token = namedtuple('Token', 'type value line col kw_id', defaults=(0,))
+
+# 关键字列表; KEYWORD 的正则和关键字编号 (Kw) 都由它生成, 两者不会不一致
+KEYWORDS = ['var', 'integer', 'longint', 'bool', 'begin', 'end']
+
+def _trie_pattern(words):
+    """把一组单词按公共前缀合并成前缀树形式的正则分支"""
+    branches = {}
+    for word in sorted(words):
+        branches.setdefault(word[:1], []).append(word[1:])
+    alternatives = []
+    for first, rests in branches.items():
+        if len(rests) == 1:
+            alternatives.append(re.escape(first + rests[0]))
+            continue
+        tails = [rest for rest in rests if rest]
+        optional = '?' if len(tails) < len(rests) else ''
+        alternatives.append(f"{re.escape(first)}(?:{_trie_pattern(tails)}){optional}")
+    return '|'.join(alternatives)
+
 # 定义 Token 类型
 TOKENS = {
-    'KEYWORD': r'\b(var|integer|longint|bool|begin|end)\b', 
+    # 关键字由 KEYWORDS 按首字母合并成前缀树形式, 匹配时在第一个字符就能排除大部分分支
+    'KEYWORD': rf'\b(?:{_trie_pattern(KEYWORDS)})\b',
     'IDENTIFIER': r'[a-zA-Z][a-zA-Z0-9]*',
     'INTEGER_LITERAL': r'[0-9]+',
     'ASSIGN': r':=',
@@ -21,88 +46,118 @@ TOKENS = {
 }
 
 token_regex = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in TOKENS.items())
+_TOKEN_RE = re.compile(token_regex)
+
+# 只把 ASCII 大写字母转成小写, 不改变字符串长度, 行号列号保持不变
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+# Token 类型编码为整数, 解析时比较整数而不是字符串
+Tok = IntEnum('Tok', list(TOKENS) + ['EOF'])
+_KIND = {name: Tok[name].value for name in TOKENS}
+
+# 解析器里比较用的整数常量; Token 中存的也是普通 int, 只在报错时用 Tok(...).name 转回名字
+T_KEYWORD = Tok.KEYWORD.value
+T_IDENTIFIER = Tok.IDENTIFIER.value
+T_INTEGER_LITERAL = Tok.INTEGER_LITERAL.value
+T_ASSIGN = Tok.ASSIGN.value
+T_OP_ADD = Tok.OP_ADD.value
+T_OP_SUB = Tok.OP_SUB.value
+T_SEMICOLON = Tok.SEMICOLON.value
+T_COLON = Tok.COLON.value
+T_COMMA = Tok.COMMA.value
+T_EOF = Tok.EOF.value
+_ADD_OPS = (T_OP_ADD, T_OP_SUB)
+
+# 关键字同样编码为整数, 0 (Kw.NONE) 表示不是关键字; 解析器比较用 K_* 整数常量
+Kw = IntEnum('Kw', ['NONE'] + [kw.upper() for kw in KEYWORDS], start=0)
+_KW_IDS = {kw: Kw[kw.upper()].value for kw in KEYWORDS}
+K_VAR = Kw.VAR.value
+K_END = Kw.END.value
+
+# 读过 Token 列表末尾时共用的 EOF Token
+_EOF_TOKEN = Token(T_EOF, None, -1, -1)
 
 def lexer(code):
-    """将 Pascal 代码字符串分解为 Token 列表"""
-    tokens = []
+    """将 Pascal 代码字符串逐个分解为 Token (生成器, 解析器按需取用)"""
+    # 大小写不敏感: 整段代码先统一转小写再匹配
+    code = code.translate(_ASCII_LOWER)
     line_num = 1
-    line_start = 0
-    # 在这里添加 flags=re.IGNORECASE
-    for mo in re.finditer(token_regex, code, flags=re.IGNORECASE): 
+    line_start = 0 # 当前行第一个字符的位置
+    for mo in _TOKEN_RE.finditer(code): 
         kind = mo.lastgroup #Token 类型
         value = mo.group() #Token 值
-        column = mo.start() - line_start + 1 #列号
 
         if kind == 'WHITESPACE':
             if '\n' in value:
                 line_num += value.count('\n')
-                line_start = mo.end() - value.rfind('\n') -1
-            continue 
-        elif kind == 'MISMATCH':
-            raise SyntaxError(f"错误 (行 {line_num}, 列 {column}): 非法字符 '{value}'")
+                # 下一行从最后一个换行符之后开始
+                line_start = mo.start() + value.rfind('\n') + 1
+            continue
+        column = mo.start() - line_start + 1 #列号
 
-        #大小写不敏感
-        if kind == 'KEYWORD' or kind == 'IDENTIFIER':
-             value = value.lower() 
+        if kind == 'MISMATCH':
+            raise SyntaxError(f"错误 (行 {line_num}, 列 {column}): 非法字符 '{value}'")
+        elif kind == 'IDENTIFIER':
+            # 驻留变量名, 符号表查找时可以直接按地址命中
+            value = sys.intern(value)
 
-        tokens.append({'type': kind, 'value': value, 'line': line_num, 'col': column})
+        if kind == 'KEYWORD':
+            yield Token(T_KEYWORD, value, line_num, column, _KW_IDS[value])
+        else:
+            yield Token(_KIND[kind], value, line_num, column)
 
-    tokens.append({'type': 'EOF', 'value': None, 'line': line_num, 'col': -1}) 
-    return tokens
+    yield Token(T_EOF, None, line_num, -1)
 
 # --- 2. 语法/语义分析 与 代码生成  ---
 # 语法分析采用自顶向下一次扫描的方法
 # 语义分析和代码生成在同一阶段完成
 class PascalToCppConverter:
     def __init__(self, tokens):
-        self.tokens = tokens
-        self.current_token_index = 0
-        self.current_token = self.tokens[0]
-        self.symbol_table = {} # 符号表: {'var_name_lower': {'type': 'pascal_type', 'cpp_type': 'c++_type'}}
+        self._iter = iter(tokens)
+        self.current_token = next(self._iter, _EOF_TOKEN)
+        # 符号表按列存放: 变量名 -> 下标, 下标处依次是 pascal 类型和 c++ 类型
+        self._sym_idx = {}
+        self._sym_ptype = []
+        self._sym_ctype = []
         self.cpp_declarations = [] # 存储 C++ 变量声明
         self.cpp_body = [] # 存储 C++ 实现体代码
         self.errors = [] # 存储错误信息
 
     def _next_token(self):
         """前进到下一个 Token"""
-        self.current_token_index += 1
-        if self.current_token_index < len(self.tokens):
-            self.current_token = self.tokens[self.current_token_index]
-        else:
-            # 防止索引越界，但理论上应该由 EOF 处理
-            self.current_token = {'type': 'EOF', 'value': None, 'line': -1, 'col': -1}
+        self.current_token = next(self._iter, _EOF_TOKEN)
 
     def _error(self, message):
         """记录错误信息"""
         token = self.current_token
-        err_msg = f"错误 (行 {token.get('line', '?')}, 列 {token.get('col', '?')}): {message}"
+        err_msg = f"错误 (行 {token.line}, 列 {token.col}): {message}"
         # 尝试指出出错的 Token 值
-        if token.get('value') is not None:
-           err_msg += f" (遇到: '{token['value']}')"
-        elif token['type'] != 'EOF':
-             err_msg += f" (遇到 Token 类型: {token['type']})"
+        if token.value is not None:
+           err_msg += f" (遇到: '{token.value}')"
+        elif token.type != T_EOF:
+             err_msg += f" (遇到 Token 类型: {Tok(token.type).name})"
 
         self.errors.append(err_msg)
         raise SyntaxError(err_msg)
 
     def _expect(self, token_type, expected_value=None):
         """检查当前 Token 是否符合预期类型（和值），如果不符合则报错，符合则前进"""
-        if self.current_token['type'] == token_type:
-            if expected_value is None or self.current_token['value'] == expected_value:
-                token_value = self.current_token['value']
+        if self.current_token.type == token_type:
+            if expected_value is None or self.current_token.value == expected_value:
+                token_value = self.current_token.value
                 self._next_token()
                 return token_value # 返回符合预期的 Token 的值
             else:
-                self._error(f"期望得到 '{expected_value}' 但得到了 '{self.current_token['value']}'")
+                self._error(f"期望得到 '{expected_value}' 但得到了 '{self.current_token.value}'")
         else:
-            expected_desc = f"'{expected_value}'" if expected_value else f"类型 '{token_type}'"
-            self._error(f"期望得到 {expected_desc} 但得到了类型 '{self.current_token['type']}'")
+            expected_desc = f"'{expected_value}'" if expected_value else f"类型 '{Tok(token_type).name}'"
+            self._error(f"期望得到 {expected_desc} 但得到了类型 '{Tok(self.current_token.type).name}'")
 
     def _parse_type(self):
         """解析变量类型"""
         token = self.current_token
-        if token['type'] == 'KEYWORD' and token['value'] in ['integer', 'longint', 'bool']:
-            pascal_type = token['value']
+        if token.type == T_KEYWORD and token.value in ['integer', 'longint', 'bool']:
+            pascal_type = token.value
             self._next_token()
             # 映射到 C++ 类型，因为后面要翻译
             if pascal_type == 'integer':
@@ -116,93 +171,98 @@ class PascalToCppConverter:
 
     def _parse_var_declaration(self):
         """解析 var 声明块"""
-        self._expect('KEYWORD', 'var')
+        self._expect(T_KEYWORD, 'var')
         # Var 关键字后面应该至少有一个空格，Lexer 会将其作为 WHITESPACE 跳过
         # 我们只需检查下一个 token 是不是 IDENTIFIER
-        if self.current_token['type'] != 'IDENTIFIER':
+        if self.current_token.type != T_IDENTIFIER:
              # 模拟 "Var后缺空格" 或 "Var后直接跟了非法字符" 的错误
              # 实际是因为 Var 后面不是合法的标识符开头
             self._error("关键字 'var' 后面需要跟变量名")
 
-        while self.current_token['type'] == 'IDENTIFIER':
+        while self.current_token.type == T_IDENTIFIER:
             variables = []
-            variables.append(self._expect('IDENTIFIER'))
+            variables.append(self._expect(T_IDENTIFIER))
 
-            while self.current_token['type'] == 'COMMA':
+            while self.current_token.type == T_COMMA:
                 self._next_token() # 跳过逗号
-                variables.append(self._expect('IDENTIFIER'))
+                variables.append(self._expect(T_IDENTIFIER))
 
-            self._expect('COLON')
+            self._expect(T_COLON)
             pascal_type, cpp_type = self._parse_type()
 
             # 检查并注册变量到符号表
             cpp_declaration_line = f"{cpp_type} "
             var_names_in_line = []
             for var_name in variables:
-                if var_name in self.symbol_table:
+                if var_name in self._sym_idx:
                     self._error(f"变量 '{var_name}' 重复定义")
-                if not re.match(r'^[a-zA-Z][a-zA-Z0-9]*$', var_name):
-                     # 这个检查理论上 Lexer 就完成了，但可以再加一层保险
-                     self._error(f"非法变量名 '{var_name}'")
                 
-                self.symbol_table[var_name] = {'type': pascal_type, 'cpp_type': cpp_type}
+                self._sym_idx[var_name] = len(self._sym_ptype)
+                self._sym_ptype.append(pascal_type)
+                self._sym_ctype.append(cpp_type)
                 var_names_in_line.append(var_name)
 
             cpp_declaration_line += ", ".join(var_names_in_line) + ";"
             self.cpp_declarations.append(cpp_declaration_line)
 
-            self._expect('SEMICOLON')
+            self._expect(T_SEMICOLON)
             # 继续处理下一行声明，或者结束 var 块
 
     def _parse_factor(self):
         """解析表达式的因子"""
         token = self.current_token
-        if token['type'] == 'IDENTIFIER':
-            var_name = token['value']
-            if var_name not in self.symbol_table:
+        if token.type == T_IDENTIFIER:
+            var_name = token.value
+            if var_name not in self._sym_idx:
                 self._error(f"使用了未定义的变量 '{var_name}'")
             self._next_token()
             return var_name # 返回 C++ 中对应的变量名 (已转小写)
-        elif token['type'] == 'INTEGER_LITERAL':
-            value = token['value']
+        elif token.type == T_INTEGER_LITERAL:
+            value = token.value
             self._next_token()
             return value # 返回数字字符串
         else:
             self._error("表达式中期望得到变量或数字")
 
-    def _parse_term(self):
-        # 解析因子
-        return self._parse_factor()
-
     def _parse_expression(self):
         """解析表达式 """
-        cpp_expr = self._parse_term()
-        while self.current_token['type'] in ['OP_ADD', 'OP_SUB']:
+        parts = [self._parse_factor()]
+        while self.current_token.type in _ADD_OPS:
             op_token = self.current_token
             self._next_token()
-            right_term = self._parse_term()
-            cpp_expr += f" {op_token['value']} {right_term}" # 直接使用 + 或 -
-        return cpp_expr
+            right_term = self._parse_factor()
+            parts.append(op_token.value) # 直接使用 + 或 -
+            parts.append(right_term)
+        return ' '.join(parts)
 
     def _parse_assignment_statement(self):
         """解析赋值语句: Identifier := Expression ;"""
-        var_name = self._expect('IDENTIFIER')
-        if var_name not in self.symbol_table:
+        # 赋值语句最常见, 这里直接检查 Token 类型, 不符合时再交给 _expect 报错
+        tok = self.current_token
+        if tok.type != T_IDENTIFIER:
+            self._expect(T_IDENTIFIER)
+        var_name = tok.value
+        self._next_token()
+        if var_name not in self._sym_idx:
              self._error(f"尝试给未定义的变量 '{var_name}' 赋值")
 
-        self._expect('ASSIGN') # 检查 :=
+        if self.current_token.type != T_ASSIGN: # 检查 :=
+            self._expect(T_ASSIGN)
+        self._next_token()
         
         cpp_expr = self._parse_expression()
         
-        self._expect('SEMICOLON')
+        if self.current_token.type != T_SEMICOLON:
+            self._expect(T_SEMICOLON)
+        self._next_token()
 
         self.cpp_body.append(f"    {var_name} = {cpp_expr};") # 添加 C++ 赋值语句 (带缩进)
 
     def _parse_statement(self):
         """解析单条语句"""
-        if self.current_token['type'] == 'IDENTIFIER':
+        if self.current_token.type == T_IDENTIFIER:
             self._parse_assignment_statement()
-        # elif self.current_token['type'] == 'KEYWORD' and self.current_token['value'] == 'if':
+        # elif self.current_token.type == T_KEYWORD and self.current_token.value == 'if':
         #     self._parse_if_statement()
         else:
             self._error("期望得到语句的开头")
@@ -210,22 +270,22 @@ class PascalToCppConverter:
 
     def _parse_implementation_block(self):
         """解析 begin...end 实现块"""
-        self._expect('KEYWORD', 'begin')
+        self._expect(T_KEYWORD, 'begin')
         
         # begin 后面可以跟多个语句，直到 end
         # 检查是否直接就是 end
-        while not (self.current_token['type'] == 'KEYWORD' and self.current_token['value'] == 'end'):
-            if self.current_token['type'] == 'EOF':
+        while self.current_token.kw_id != K_END:
+            if self.current_token.type == T_EOF:
                  self._error("代码在 'end' 之前意外结束")
             self._parse_statement() # 解析一条语句
 
-        self._expect('KEYWORD', 'end')
+        self._expect(T_KEYWORD, 'end')
         # Pascal 的主程序块后面可能跟句号 '.' 或 分号 ';'
         # 在这个简化版里，我们假设 end 后面就是结束了，或者跟一个分号（如果后面还有代码）
         # 我们这里强制要求 end 后面要么是 EOF 要么是分号（如果允许嵌套块）
         # 对于顶级块，我们期望后面是 EOF 或没有更多内容了
         # 考虑到简单性，如果后面是分号，我们也接受并前进
-        if self.current_token['type'] == 'SEMICOLON':
+        if self.current_token.type == T_SEMICOLON:
             self._next_token()
         # 如果后面还有其他非 EOF token，可能是一个语法错误
 
@@ -233,51 +293,51 @@ class PascalToCppConverter:
         """执行解析和转换"""
         try:
             # var 块
-            if self.current_token['type'] == 'KEYWORD' and self.current_token['value'] == 'var':
+            if self.current_token.kw_id == K_VAR:
                 self._parse_var_declaration()
 
             # 实现块
             self._parse_implementation_block()
 
             # 检查解析是否到达文件末尾 (允许最后一个 end 后有空白)
-            if self.current_token['type'] != 'EOF':
+            if self.current_token.type != T_EOF:
                 self._error(f"在 'end' 之后有未预期的内容")
 
             # 如果没有错误，生成 C++ 代码
             if not self.errors:
-                cpp_code = "#include <iostream>\n"
+                out = ["#include <iostream>\n"]
                 # 可以根据需要包含其他头文件，例如 <string> 或 <vector>
                 # 如果使用了 long long，最好包含 <cstdint> 或确保编译器支持
-                cpp_code += "#include <vector>\n" # 示例
-                cpp_code += "#include <string>\n" # 示例
+                out.append("#include <vector>\n") # 示例
+                out.append("#include <string>\n") # 示例
                 
                 # 添加命名空间
-                cpp_code += "\nusing namespace std;\n\n"
+                out.append("\nusing namespace std;\n\n")
 
                 # 添加 main 函数
-                cpp_code += "int main() {\n"
+                out.append("int main() {\n")
 
                 # 添加变量声明
                 if self.cpp_declarations:
-                    cpp_code += "    // Variable declarations\n"
+                    out.append("    // Variable declarations\n")
                     for decl in self.cpp_declarations:
-                        cpp_code += f"    {decl}\n"
-                    cpp_code += "\n"
+                        out.append(f"    {decl}\n")
+                    out.append("\n")
 
                 # 添加实现体代码
                 if self.cpp_body:
-                    cpp_code += "    // Implementation\n"
+                    out.append("    // Implementation\n")
                     for line in self.cpp_body:
-                        cpp_code += f"{line}\n"
-                    cpp_code += "\n"
+                        out.append(f"{line}\n")
+                    out.append("\n")
                 else:
-                    cpp_code += "    // No implementation code\n\n"
+                    out.append("    // No implementation code\n\n")
 
 
                 # 添加默认的 return 语句
-                cpp_code += "    return 0;\n"
-                cpp_code += "}\n"
-                return cpp_code
+                out.append("    return 0;\n")
+                out.append("}\n")
+                return ''.join(out)
             else:
                 # 返回错误信息列表
                 return None
@@ -285,6 +345,12 @@ class PascalToCppConverter:
         except SyntaxError as e:
             # 错误已经被记录在 self.errors 中，这里只是捕获停止信号
             # print(f"解析中止: {e}") # 可以在这里打印错误信息
+            # Token 是边解析边生成的，词法错误也会从这里抛出，它没有记录在 self.errors 中，交给调用者处理
+            if not self.errors:
+                raise
+            # 出错位置之后的代码还没有经过词法分析, 把剩下的 Token 读完, 这样词法错误仍然优先于语法错误报告
+            for _ in self._iter:
+                pass
             return None # 表示转换失败
         except Exception as e:
              # 捕获其他意外错误
@@ -305,7 +371,7 @@ def main(pascal_code):
     try:
         tokens = lexer(pascal_code)
         # print("--- Tokens ---")
-        # for token in tokens:
+        # for token in lexer(pascal_code): # tokens 是生成器, 打印要另外生成一份, 否则会被读空
         #     print(token)
         # print("-" * 25)
 
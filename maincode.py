@@ -1,12 +1,38 @@
 import re
 import sys
+from collections import namedtuple
+from enum import IntEnum
+from functools import lru_cache
 
 # --- 1. 词法分析 (Lexer) ---
 
+# Token 用 namedtuple 表示, 按属性访问 (token.type, token.value, ...)
+# kw_id 是关键字编号 (Kw), 非关键字为 0
+Token = namedtuple('Token', 'type value line col kw_id', defaults=(0,))
+
+# 关键字列表; KEYWORD 的正则和关键字编号 (Kw) 都由它生成, 两者不会不一致
+KEYWORDS = ['var', 'integer', 'longint', 'bool', 'begin', 'end', 'if', 'then', 'else', 'while', 'do']
+
+def _trie_pattern(words):
+    """把一组单词按公共前缀合并成前缀树形式的正则分支"""
+    branches = {}
+    for word in sorted(words):
+        branches.setdefault(word[:1], []).append(word[1:])
+    alternatives = []
+    for first, rests in branches.items():
+        if len(rests) == 1:
+            alternatives.append(re.escape(first + rests[0]))
+            continue
+        tails = [rest for rest in rests if rest]
+        optional = '?' if len(tails) < len(rests) else ''
+        alternatives.append(f"{re.escape(first)}(?:{_trie_pattern(tails)}){optional}")
+    return '|'.join(alternatives)
+
 # 定义 Token 类型
 TOKENS = {
-    'KEYWORD': r'\b(var|integer|longint|bool|begin|end|if|then|else|while|do)\b',
-    'BOOLEAN_LITERAL': r'\b(true|false)\b',
+    # 关键字由 KEYWORDS 按首字母合并成前缀树形式, 匹配时在第一个字符就能排除大部分分支
+    'KEYWORD': rf'\b(?:{_trie_pattern(KEYWORDS)})\b',
+    'BOOLEAN_LITERAL': r'\b(?:false|true)\b',
     'IDENTIFIER': r'[a-zA-Z][a-zA-Z0-9]*',
     'INTEGER_LITERAL': r'[0-9]+',
     'ASSIGN': r':=',
@@ -29,82 +55,129 @@ TOKENS = {
 
 
 token_regex = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in TOKENS.items())
+_TOKEN_RE = re.compile(token_regex)
+
+# 只把 ASCII 大写字母转成小写, 不改变字符串长度, 行号列号保持不变
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+# Token 类型编码为整数, 解析时比较整数而不是字符串
+Tok = IntEnum('Tok', list(TOKENS) + ['EOF'])
+_KIND = {name: Tok[name].value for name in TOKENS}
+
+# 解析器里比较用的整数常量; Token 中存的也是普通 int, 只在报错时用 Tok(...).name 转回名字
+T_KEYWORD = Tok.KEYWORD.value
+T_BOOLEAN_LITERAL = Tok.BOOLEAN_LITERAL.value
+T_IDENTIFIER = Tok.IDENTIFIER.value
+T_INTEGER_LITERAL = Tok.INTEGER_LITERAL.value
+T_ASSIGN = Tok.ASSIGN.value
+T_OP_ADD = Tok.OP_ADD.value
+T_OP_SUB = Tok.OP_SUB.value
+T_OP_EQ = Tok.OP_EQ.value
+T_OP_NEQ = Tok.OP_NEQ.value
+T_OP_LT = Tok.OP_LT.value
+T_OP_LTE = Tok.OP_LTE.value
+T_OP_GT = Tok.OP_GT.value
+T_OP_GTE = Tok.OP_GTE.value
+T_SEMICOLON = Tok.SEMICOLON.value
+T_COLON = Tok.COLON.value
+T_COMMA = Tok.COMMA.value
+T_LPAREN = Tok.LPAREN.value
+T_RPAREN = Tok.RPAREN.value
+T_MISMATCH = Tok.MISMATCH.value
+T_EOF = Tok.EOF.value
+_ADD_OPS = (T_OP_ADD, T_OP_SUB)
+_REL_OPS = frozenset((T_OP_EQ, T_OP_NEQ, T_OP_LT, T_OP_LTE, T_OP_GT, T_OP_GTE))
+
+# 关键字同样编码为整数, 0 (Kw.NONE) 表示不是关键字; 解析器比较用 K_* 整数常量
+Kw = IntEnum('Kw', ['NONE'] + [kw.upper() for kw in KEYWORDS], start=0)
+_KW_IDS = {kw: Kw[kw.upper()].value for kw in KEYWORDS}
+K_VAR = Kw.VAR.value
+K_BEGIN = Kw.BEGIN.value
+K_END = Kw.END.value
+K_IF = Kw.IF.value
+K_ELSE = Kw.ELSE.value
+K_WHILE = Kw.WHILE.value
+
+# 读过 Token 列表末尾时共用的 EOF Token
+_EOF_TOKEN = Token(T_EOF, None, -1, -1)
 
 def lexer(code):
-    """将 Pascal 代码字符串分解为 Token 列表"""
-    tokens = []
+    """将 Pascal 代码字符串逐个分解为 Token (生成器, 解析器按需取用)"""
+    # 大小写不敏感: 整段代码先统一转小写再匹配
+    code = code.translate(_ASCII_LOWER)
     line_num = 1
-    line_start = 0
-    for mo in re.finditer(token_regex, code, flags=re.IGNORECASE):
+    line_start = 0 # 当前行第一个字符的位置
+    for mo in _TOKEN_RE.finditer(code):
         kind = mo.lastgroup
         value = mo.group()
-        column = mo.start() - line_start + 1
 
         if kind == 'WHITESPACE':
             if '\n' in value:
                 line_num += value.count('\n')
-                line_start = mo.end() - value.rfind('\n') - 1
+                # 下一行从最后一个换行符之后开始
+                line_start = mo.start() + value.rfind('\n') + 1
             continue
-        elif kind == 'MISMATCH':
-            raise SyntaxError(f"错误 (行 {line_num}, 列 {column}): 非法字符 '{value}'")
+        column = mo.start() - line_start + 1
 
-        # 大小写不敏感
-        if kind in ['KEYWORD', 'IDENTIFIER', 'BOOLEAN_LITERAL']:
-            value = value.lower()
+        if kind == 'MISMATCH':
+            raise SyntaxError(f"错误 (行 {line_num}, 列 {column}): 非法字符 '{value}'")
+        elif kind == 'IDENTIFIER':
+            # 驻留变量名, 符号表查找时可以直接按地址命中
+            value = sys.intern(value)
 
-        tokens.append({'type': kind, 'value': value, 'line': line_num, 'col': column})
+        if kind == 'KEYWORD':
+            yield Token(T_KEYWORD, value, line_num, column, _KW_IDS[value])
+        else:
+            yield Token(_KIND[kind], value, line_num, column)
 
-    tokens.append({'type': 'EOF', 'value': None, 'line': line_num, 'col': -1})
-    return tokens
+    yield Token(T_EOF, None, line_num, -1)
 
 # --- 2. 语法/语义分析 与 代码生成 ---
 class PascalToCppConverter:
     def __init__(self, tokens):
-        self.tokens = tokens
-        self.current_token_index = 0
-        self.current_token = self.tokens[0]
-        self.symbol_table = {} # {'var_name_lower': {'type': 'pascal_type', 'cpp_type': 'c++_type'}}
+        self._iter = iter(tokens)
+        self.current_token = next(self._iter, _EOF_TOKEN)
+        # 符号表按列存放: 变量名 -> 下标, 下标处依次是 pascal 类型和 c++ 类型
+        self._sym_idx = {}
+        self._sym_ptype = []
+        self._sym_ctype = []
         self.cpp_declarations = []
         self.cpp_body = []
         self.errors = []
 
     def _next_token(self):
-        # 更新当前 Token 的 index
-        self.current_token_index += 1
-        if self.current_token_index < len(self.tokens):
-            self.current_token = self.tokens[self.current_token_index]
-        else:
-            self.current_token = {'type': 'EOF', 'value': None, 'line': -1, 'col': -1}
+        # 从 lexer 取下一个 Token, 取完之后一直是 EOF
+        self.current_token = next(self._iter, _EOF_TOKEN)
 
     def _error(self, message):
         # 记录错误信息
         token = self.current_token
-        err_msg = f"错误 (行 {token.get('line', '?')}, 列 {token.get('col', '?')}): {message}"
-        if token.get('value') is not None:
-            err_msg += f" (遇到: '{token['value']}')"
-        elif token['type'] != 'EOF':
-            err_msg += f" (遇到 Token 类型: {token['type']})"
+        err_msg = f"错误 (行 {token.line}, 列 {token.col}): {message}"
+        if token.value is not None:
+            err_msg += f" (遇到: '{token.value}')"
+        elif token.type != T_EOF:
+            err_msg += f" (遇到 Token 类型: {Tok(token.type).name})"
         self.errors.append(err_msg)
         raise SyntaxError(err_msg)
 
     def _expect(self, token_type, expected_value=None):
         # 检查当前 Token 是否符合预期
-        if self.current_token['type'] == token_type:
-            if expected_value is None or self.current_token['value'] == expected_value:
-                token_value = self.current_token['value']
+        if self.current_token.type == token_type:
+            if expected_value is None or self.current_token.value == expected_value:
+                token_value = self.current_token.value
                 self._next_token()
                 return token_value
             else:
-                self._error(f"期望得到 '{expected_value}' 但得到了 '{self.current_token['value']}'")
+                self._error(f"期望得到 '{expected_value}' 但得到了 '{self.current_token.value}'")
         else:
-            expected_desc = f"'{expected_value}'" if expected_value else f"类型 '{token_type}'"
-            self._error(f"期望得到 {expected_desc} 但得到了类型 '{self.current_token['type']}'")
+            expected_desc = f"'{expected_value}'" if expected_value else f"类型 '{Tok(token_type).name}'"
+            self._error(f"期望得到 {expected_desc} 但得到了类型 '{Tok(self.current_token.type).name}'")
 
     def _parse_type(self):
         # 解析变量类型
         token = self.current_token
-        if token['type'] == 'KEYWORD' and token['value'] in ['integer', 'longint', 'bool']:
-            pascal_type = token['value']
+        if token.type == T_KEYWORD and token.value in ['integer', 'longint', 'bool']:
+            pascal_type = token.value
             self._next_token()
             if pascal_type == 'integer': return pascal_type, 'int'
             elif pascal_type == 'longint': return pascal_type, 'long long'
@@ -114,70 +187,70 @@ class PascalToCppConverter:
 
     def _parse_var_declaration(self):
         # 声明部分的解析
-        self._expect('KEYWORD', 'var')
-        if self.current_token['type'] != 'IDENTIFIER':
+        self._expect(T_KEYWORD, 'var')
+        if self.current_token.type != T_IDENTIFIER:
             self._error("关键字 'var' 后面需要跟变量名")
 
-        while self.current_token['type'] == 'IDENTIFIER':
-            variables = [self._expect('IDENTIFIER')]
-            while self.current_token['type'] == 'COMMA':
+        while self.current_token.type == T_IDENTIFIER:
+            variables = [self._expect(T_IDENTIFIER)]
+            while self.current_token.type == T_COMMA:
                 self._next_token() # 跳过逗号
-                variables.append(self._expect('IDENTIFIER'))
+                variables.append(self._expect(T_IDENTIFIER))
 
-            self._expect('COLON') # 期望冒号
+            self._expect(T_COLON) # 期望冒号
             pascal_type, cpp_type = self._parse_type()
             # 转换为 cpp 声明
             cpp_declaration_line = f"{cpp_type} "
             var_names_in_line = []
             for var_name in variables:
-                if var_name in self.symbol_table:
+                if var_name in self._sym_idx:
                     self._error(f"变量 '{var_name}' 重复定义")
-                if not re.match(r'^[a-zA-Z][a-zA-Z0-9]*$', var_name): 
-                     self._error(f"非法变量名 '{var_name}'")
-                self.symbol_table[var_name] = {'type': pascal_type, 'cpp_type': cpp_type}
+                self._sym_idx[var_name] = len(self._sym_ptype)
+                self._sym_ptype.append(pascal_type)
+                self._sym_ctype.append(cpp_type)
                 var_names_in_line.append(var_name)
             
             cpp_declaration_line += ", ".join(var_names_in_line) + ";"
             self.cpp_declarations.append(cpp_declaration_line)
-            self._expect('SEMICOLON') # 期望分号
+            self._expect(T_SEMICOLON) # 期望分号
 
     def _parse_factor(self):
         # 解析表达式中的因子 (变量, 数字, 布尔值, 括号)
         token = self.current_token
-        if token['type'] == 'IDENTIFIER':
-            var_name = token['value']
-            if var_name not in self.symbol_table:
+        if token.type == T_IDENTIFIER:
+            var_name = token.value
+            if var_name not in self._sym_idx:
                 self._error(f"使用了未定义的变量 '{var_name}'")
             self._next_token()
             return var_name
-        elif token['type'] == 'INTEGER_LITERAL':
-            value = token['value']
+        elif token.type == T_INTEGER_LITERAL:
+            value = token.value
             self._next_token()
             return value
-        elif token['type'] == 'BOOLEAN_LITERAL':
-            value = token['value'].lower() 
+        elif token.type == T_BOOLEAN_LITERAL:
+            value = token.value
             self._next_token()
             return value 
-        elif token['type'] == 'LPAREN':
+        elif token.type == T_LPAREN:
             self._next_token()
             expr = self._parse_expression()
-            self._expect('RPAREN')
+            if self.current_token.type != T_RPAREN:
+                self._expect(T_RPAREN)
+            self._next_token()
             return f"({expr})"
         else:
             self._error("表达式中期望得到变量, 数字, 布尔值或带括号表达式")
 
-    def _parse_term(self): 
-        return self._parse_factor()
-
     def _parse_expression(self):
         # 解析表达式
-        cpp_expr = self._parse_term()
-        while self.current_token['type'] in ['OP_ADD', 'OP_SUB']:
+        parts = [self._parse_factor()]
+        while self.current_token.type in _ADD_OPS:
             op_token = self.current_token
             self._next_token()
-            right_term = self._parse_term()
-            cpp_expr += f" {op_token['value']} {right_term}"
-        return cpp_expr
+            right_term = self._parse_factor()
+            parts.append(op_token.value)
+            parts.append(right_term)
+        return ' '.join(parts)
 
     def _parse_condition(self):
         # 解析条件表达式
@@ -185,9 +258,9 @@ class PascalToCppConverter:
         
         op_map = { '=': '==', '<>': '!=' }
 
-        if self.current_token['type'] in ['OP_EQ', 'OP_NEQ', 'OP_LT', 'OP_LTE', 'OP_GT', 'OP_GTE']:
-            op_pascal = self.current_token['value']
-            op_token_type = self.current_token['type']
+        if self.current_token.type in _REL_OPS:
+            op_pascal = self.current_token.value
+            op_token_type = self.current_token.type
             self._next_token()
             right_expr = self._parse_expression()
             
@@ -200,12 +273,21 @@ class PascalToCppConverter:
 
     def _parse_assignment_statement(self, indent_level=1):
         # 解析赋值语句
-        var_name = self._expect('IDENTIFIER')
-        if var_name not in self.symbol_table:
+        # 这里是最常走的路径, 直接检查 Token 类型; 不符合时交给 _expect 报错
+        tok = self.current_token
+        if tok.type != T_IDENTIFIER:
+            self._expect(T_IDENTIFIER)
+        var_name = tok.value
+        self._next_token()
+        if var_name not in self._sym_idx:
             self._error(f"尝试给未定义的变量 '{var_name}' 赋值")
-        self._expect('ASSIGN')
+        if self.current_token.type != T_ASSIGN:
+            self._expect(T_ASSIGN)
+        self._next_token()
         cpp_expr = self._parse_expression()
-        self._expect('SEMICOLON')
+        if self.current_token.type != T_SEMICOLON:
+            self._expect(T_SEMICOLON)
+        self._next_token()
         indent = "    " * indent_level
         self.cpp_body.append(f"{indent}{var_name} = {cpp_expr};")
 
@@ -214,16 +296,16 @@ class PascalToCppConverter:
         braces_indent = "    " * indent_level_for_braces # 处理缩进
         statements_inside_indent_level = indent_level_for_braces + 1
 
-        if self.current_token['type'] == 'KEYWORD' and self.current_token['value'] == 'begin':
+        if self.current_token.kw_id == K_BEGIN:
             self._next_token() #  BEGIN
             self.cpp_body.append(f"{braces_indent}{{")
-            while not (self.current_token['type'] == 'KEYWORD' and self.current_token['value'] == 'end'):
-                if self.current_token['type'] == 'EOF':
+            while self.current_token.kw_id != K_END:
+                if self.current_token.type == T_EOF:
                     self._error("代码在 'begin' 块内 'end' 之前意外结束")
                 self._parse_statement(statements_inside_indent_level)
-            self._expect('KEYWORD', 'end') #  END
+            self._expect(T_KEYWORD, 'end') #  END
 
-            if self.current_token['type'] == 'SEMICOLON':
+            if self.current_token.type == T_SEMICOLON:
                  self._next_token()
             self.cpp_body.append(f"{braces_indent}}}")
         else:
@@ -234,13 +316,13 @@ class PascalToCppConverter:
 
     def _parse_if_statement(self, indent_level=1):
         base_indent = "    " * indent_level
-        self._expect('KEYWORD', 'if')
+        self._expect(T_KEYWORD, 'if')
         condition_cpp = self._parse_condition()
         self.cpp_body.append(f"{base_indent}if ({condition_cpp})")
-        self._expect('KEYWORD', 'then')
+        self._expect(T_KEYWORD, 'then')
         self._parse_body_statement(indent_level) 
 
-        if self.current_token['type'] == 'KEYWORD' and self.current_token['value'] == 'else':
+        if self.current_token.kw_id == K_ELSE:
             self._next_token() 
             self.cpp_body.append(f"{base_indent}else")
             self._parse_body_statement(indent_level) 
@@ -248,92 +330,111 @@ class PascalToCppConverter:
 
     def _parse_while_statement(self, indent_level=1):
         base_indent = "    " * indent_level
-        self._expect('KEYWORD', 'while')
+        self._expect(T_KEYWORD, 'while')
         condition_cpp = self._parse_condition()
         self.cpp_body.append(f"{base_indent}while ({condition_cpp})")
-        self._expect('KEYWORD', 'do')
+        self._expect(T_KEYWORD, 'do')
         self._parse_body_statement(indent_level) 
 
     def _parse_statement(self, indent_level=1):
         """解析单条语句"""
-        if self.current_token['type'] == 'IDENTIFIER':
+        tok = self.current_token
+        if tok.type == T_IDENTIFIER:
             self._parse_assignment_statement(indent_level)
-        elif self.current_token['type'] == 'KEYWORD':
-            if self.current_token['value'] == 'if':
-                self._parse_if_statement(indent_level)
-            elif self.current_token['value'] == 'while':
-                self._parse_while_statement(indent_level)
-            elif self.current_token['value'] == 'begin':
-                self._parse_body_statement(indent_level)
-            else:
+        elif tok.type == T_KEYWORD:
+            handler = self._STMT_HANDLERS.get(tok.kw_id)
+            if handler is None:
                 self._error("期望得到语句的开头 (赋值, if, while, begin, 或者其他语句关键字)")
+            handler(self, indent_level)
         else:
             self._error("期望得到语句的开头 (标识符, if, while, begin)")
 
 
     def _parse_implementation_block(self):
         # 解析主程序实现块 (BEGIN...END.)
-        self._expect('KEYWORD', 'begin')
-        while not (self.current_token['type'] == 'KEYWORD' and self.current_token['value'] == 'end'):
-            if self.current_token['type'] == 'EOF':
+        self._expect(T_KEYWORD, 'begin')
+        while self.current_token.kw_id != K_END:
+            if self.current_token.type == T_EOF:
                 self._error("代码在主程序 'begin' 后 'end' 之前意外结束")
             self._parse_statement(indent_level=1)
-        self._expect('KEYWORD', 'end')
-        if self.current_token['type'] == 'SEMICOLON': 
+        self._expect(T_KEYWORD, 'end')
+        if self.current_token.type == T_SEMICOLON: 
             self._next_token()
 
     def parse(self):
         # 执行完整的解析和转换过程
         try:
-            if self.current_token['type'] == 'KEYWORD' and self.current_token['value'] == 'var':
+            if self.current_token.kw_id == K_VAR:
                 self._parse_var_declaration()
 
             self._parse_implementation_block()
 
-            if self.current_token['type'] != 'EOF':
-                if self.current_token['type'] == 'MISMATCH' and self.current_token['value'] == '.':
+            if self.current_token.type != T_EOF:
+                if self.current_token.type == T_MISMATCH and self.current_token.value == '.':
                     self._next_token()
-                    if self.current_token['type'] != 'EOF':
+                    if self.current_token.type != T_EOF:
                          self._error(f"在程序末尾的 '.' 之后有未预期的内容")
-                elif self.current_token['type'] != 'EOF':
+                elif self.current_token.type != T_EOF:
                     self._error(f"在 'end' 之后有未预期的内容")
 
 
             if not self.errors:
-                cpp_code = "#include <iostream>\n"
-                cpp_code += "#include <string>\n" 
-                cpp_code += "\nusing namespace std;\n\n"
-                cpp_code += "int main() {\n"
+                out = ["#include <iostream>\n"]
+                out.append("#include <string>\n") 
+                out.append("\nusing namespace std;\n\n")
+                out.append("int main() {\n")
 
                 if self.cpp_declarations:
-                    cpp_code += "    // Variable declarations\n"
+                    out.append("    // Variable declarations\n")
                     for decl in self.cpp_declarations:
-                        cpp_code += f"    {decl}\n" 
-                    cpp_code += "\n"
+                        out.append(f"    {decl}\n") 
+                    out.append("\n")
 
                 if self.cpp_body:
-                    cpp_code += "    // Implementation\n"
+                    out.append("    // Implementation\n")
                     for line in self.cpp_body: 
-                        cpp_code += f"{line}\n"
-                    cpp_code += "\n"
+                        out.append(f"{line}\n")
+                    out.append("\n")
                 else:
-                    cpp_code += "    // No implementation code\n\n"
+                    out.append("    // No implementation code\n\n")
 
-                cpp_code += "    return 0;\n"
-                cpp_code += "}\n"
-                return cpp_code
+                out.append("    return 0;\n")
+                out.append("}\n")
+                return ''.join(out)
             else:
                 return None
         except SyntaxError:
-            return None 
+            # Token 是边解析边生成的, 词法错误也会在这里抛出; 它没有记录在 self.errors 中, 交给调用者处理
+            if not self.errors:
+                raise
+            # 出错位置之后的代码还没有经过词法分析, 把剩下的 Token 读完, 这样词法错误仍然优先于语法错误报告
+            for _ in self._iter:
+                pass
+            return None
         except Exception as e:
             self.errors.append(f"意外内部错误: {e}")
             import traceback
             traceback.print_exc()
             return None
 
+# 语句关键字 -> 对应的解析方法, 由 _parse_statement 查表分派
+PascalToCppConverter._STMT_HANDLERS = {
+    K_IF: PascalToCppConverter._parse_if_statement,
+    K_WHILE: PascalToCppConverter._parse_while_statement,
+    K_BEGIN: PascalToCppConverter._parse_body_statement,
+}
+
 # --- 3. 主程序 ---
+@lru_cache(maxsize=128)
+def convert(pascal_code):
+    """将 Pascal 代码转换为 C++ 代码, 词法或语法错误时返回 None; 相同输入直接返回缓存结果"""
+    try:
+        return PascalToCppConverter(lexer(pascal_code)).parse()
+    except SyntaxError:
+        return None
+
 def main_convert(pascal_code):
+    """转换并打印 C++ 代码或错误信息; 需要错误信息所以不走缓存, 只要转换结果时用 convert()"""
     print("--- 输入 Pascal 代码 ---")
     print(pascal_code.strip())
     print("-" * 25)
@@ -341,8 +442,8 @@ def main_convert(pascal_code):
     try:
         tokens = lexer(pascal_code)
         # print("--- Tokens ---")
-        # for token in tokens:
-        # print(token)
+        # for token in lexer(pascal_code): # tokens 是生成器, 打印要另外生成一份, 否则会被读空
+        #     print(token)
         # print("-" * 25)
 
         converter = PascalToCppConverter(tokens)